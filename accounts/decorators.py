@@ -0,0 +1,82 @@
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.crypto import salted_hmac
+from graphql import GraphQLError
+
+from accounts.tenants import get_current_db
+
+IDEMPOTENCY_KEY_HEADER = "HTTP_IDEMPOTENCY_KEY"
+
+# Seconds a key stays claimed by a request that is still running
+IDEMPOTENCY_IN_FLIGHT_TTL = 60
+
+# Times to try claiming a key whose entry expired while it was read
+IDEMPOTENCY_CLAIM_ATTEMPTS = 3
+
+
+def hash_arguments(arguments):
+    """
+    Keyed hash of the mutation arguments, so that stored entries do not
+    reveal the arguments, passwords included
+    """
+    encoded = json.dumps(arguments, sort_keys=True, default=str)
+    return salted_hmac("accounts.idempotency", encoded).hexdigest()
+
+
+def idempotent(mutate):
+    """
+    Store the result of a mutation under the idempotency key sent with it,
+    either as the idempotency_key argument or the Idempotency-Key header.
+    Keys are scoped to the authenticated user, if any. A retry with the same
+    key and arguments returns the stored result without running the
+    mutation again, and reusing a key with different arguments is an error.
+    Results expire after IDEMPOTENCY_KEY_TTL seconds.
+    """
+
+    @wraps(mutate)
+    def wrapper(root, info, idempotency_key=None, **kwargs):
+        idempotency_key = idempotency_key or info.context.META.get(IDEMPOTENCY_KEY_HEADER)
+        if not idempotency_key:
+            return mutate(root, info, **kwargs)
+
+        user = getattr(info.context, "user", None)
+        caller = user.pk if user is not None and user.is_authenticated else "anonymous"
+        cache_key = f"idempotency:{get_current_db()}:{caller}:{info.field_name}:{idempotency_key}"
+        arguments_hash = hash_arguments(kwargs)
+
+        # The entry can expire between a failed add and the get, in which
+        # case the key is claimed again
+        for _ in range(IDEMPOTENCY_CLAIM_ATTEMPTS):
+            # A stored result of None marks a request that is still running
+            if cache.add(cache_key, (arguments_hash, None), IDEMPOTENCY_IN_FLIGHT_TTL):
+                try:
+                    result = mutate(root, info, **kwargs)
+                except Exception:
+                    cache.delete(cache_key)
+                    raise
+
+                cache.set(
+                    cache_key,
+                    (arguments_hash, result),
+                    getattr(settings, "IDEMPOTENCY_KEY_TTL", 60 * 60 * 24),
+                )
+                return result
+
+            stored = cache.get(cache_key)
+            if stored is not None:
+                break
+        else:
+            raise GraphQLError("A request with this idempotency key is still in progress")
+
+        stored_hash, result = stored
+        if stored_hash != arguments_hash:
+            raise GraphQLError("Idempotency key was already used with different arguments")
+        if result is None:
+            raise GraphQLError("A request with this idempotency key is still in progress")
+
+        return result
+
+    return wrapper
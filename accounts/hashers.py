@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+DEFAULT_POLICY = {
+    "PBKDF2_ITERATIONS": hashers.PBKDF2PasswordHasher.iterations,
+    "ARGON2_TIME_COST": hashers.Argon2PasswordHasher.time_cost,
+    "ARGON2_MEMORY_COST": hashers.Argon2PasswordHasher.memory_cost,
+    "ARGON2_PARALLELISM": hashers.Argon2PasswordHasher.parallelism,
+}
+
+
+def get_policy(name):
+    """
+    Get a hasher parameter from the PASSWORD_HASHER_POLICY setting
+    """
+    policy = getattr(settings, "PASSWORD_HASHER_POLICY", {})
+    return policy.get(name, DEFAULT_POLICY[name])
+
+
+class PolicyPBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """
+    PBKDF2 hasher with the iteration count read from the hasher policy.
+    Hashes with a different iteration count are upgraded on login.
+    """
+
+    @property
+    def iterations(self):
+        return get_policy("PBKDF2_ITERATIONS")
+
+
+class PolicyArgon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """
+    Argon2 hasher with its costs read from the hasher policy.
+    Requires the argon2-cffi library.
+    """
+
+    @property
+    def time_cost(self):
+        return get_policy("ARGON2_TIME_COST")
+
+    @property
+    def memory_cost(self):
+        return get_policy("ARGON2_MEMORY_COST")
+
+    @property
+    def parallelism(self):
+        return get_policy("ARGON2_PARALLELISM")
@@ -0,0 +1,183 @@
+import traceback
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from accounts import signals
+from accounts.tenants import get_current_db
+
+DEFAULT_SETTINGS = {
+    "BATCH_SIZE": 10,
+    "MAX_ATTEMPTS": 5,
+    "RETRY_DELAY": 10,
+    "POLL_INTERVAL": 1,
+    "LOCK_TIMEOUT": 300,
+}
+
+handlers = {}
+
+
+def get_setting(name):
+    """
+    Get a value from the JOB_QUEUE setting
+    """
+    queue_settings = getattr(settings, "JOB_QUEUE", {})
+    return queue_settings.get(name, DEFAULT_SETTINGS[name])
+
+
+def job(name):
+    """
+    Register a function as the handler for jobs with the given name
+    """
+
+    def register(handler):
+        handlers[name] = handler
+        return handler
+
+    return register
+
+
+def enqueue(name, using=None, **payload):
+    """
+    Add a job to the queue of the given database.
+    The job is saved in the current transaction, so it is only visible to
+    workers once the transaction that enqueued it commits.
+    """
+    Job = apps.get_model("accounts", "Job")
+    return Job.objects.db_manager(using).create(name=name, payload=payload)
+
+
+def claimable_jobs():
+    """
+    Jobs that are due, including running jobs whose worker stopped
+    responding and that have attempts left
+    """
+    Job = apps.get_model("accounts", "Job")
+    now = timezone.now()
+    stale = now - timedelta(seconds=get_setting("LOCK_TIMEOUT"))
+    return Job.objects.filter(
+        status=Job.Status.PENDING, run_at__lte=now
+    ) | Job.objects.filter(
+        status=Job.Status.RUNNING, locked_at__lt=stale, attempts__lt=get_setting("MAX_ATTEMPTS")
+    )
+
+
+def fail_stale_jobs():
+    """
+    Fail running jobs whose worker stopped responding on their last
+    attempt, so a job that kills its worker is not reclaimed forever
+    """
+    Job = apps.get_model("accounts", "Job")
+    stale = timezone.now() - timedelta(seconds=get_setting("LOCK_TIMEOUT"))
+    Job.objects.filter(
+        status=Job.Status.RUNNING, locked_at__lt=stale, attempts__gte=get_setting("MAX_ATTEMPTS")
+    ).update(
+        status=Job.Status.FAILED,
+        locked_by="",
+        locked_at=None,
+        last_error="The worker running the job stopped responding",
+    )
+
+
+def claim_jobs(worker_id, batch_size):
+    """
+    Lock a batch of due jobs for a worker in the current tenant's database.
+    Claiming a job counts as an attempt, so reclaiming a job whose worker
+    stopped responding counts towards MAX_ATTEMPTS.
+    Uses SELECT ... FOR UPDATE SKIP LOCKED where the database supports it.
+    Otherwise the jobs are claimed with a conditional update, and only
+    the jobs this worker managed to update are returned.
+    """
+    Job = apps.get_model("accounts", "Job")
+    alias = get_current_db()
+    now = timezone.now()
+    claim = {
+        "status": Job.Status.RUNNING,
+        "locked_by": worker_id,
+        "locked_at": now,
+        "attempts": F("attempts") + 1,
+    }
+
+    fail_stale_jobs()
+
+    if connections[alias].features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=alias):
+            jobs = list(
+                claimable_jobs().order_by("run_at").select_for_update(skip_locked=True)[:batch_size]
+            )
+            Job.objects.filter(pk__in=[claimed.pk for claimed in jobs]).update(**claim)
+        for claimed in jobs:
+            claimed.status = Job.Status.RUNNING
+            claimed.locked_by = worker_id
+            claimed.locked_at = now
+            claimed.attempts += 1
+        return jobs
+
+    ids = list(claimable_jobs().order_by("run_at").values_list("pk", flat=True)[:batch_size])
+    claimable_jobs().filter(pk__in=ids).update(**claim)
+    return list(Job.objects.filter(pk__in=ids, locked_by=worker_id, locked_at=now))
+
+
+def release_job(claimed, **fields):
+    """
+    Update a claimed job only if this worker still holds it, so a worker
+    whose job was reclaimed after LOCK_TIMEOUT cannot overwrite the state
+    written by the new owner. Returns whether the job was updated.
+    """
+    for name, value in fields.items():
+        setattr(claimed, name, value)
+    owned = type(claimed).objects.using(claimed._state.db).filter(
+        pk=claimed.pk, locked_by=claimed.locked_by
+    )
+    return owned.update(locked_by="", locked_at=None, **fields) == 1
+
+
+def run_job(claimed):
+    """
+    Run a claimed job.
+    Finished jobs are deleted. Jobs without a registered handler fail at
+    once, other failed jobs are retried with exponential backoff until
+    MAX_ATTEMPTS is reached.
+    """
+    attempts = claimed.attempts
+    handler = handlers.get(claimed.name)
+    if handler is None:
+        release_job(
+            claimed,
+            attempts=attempts,
+            status=claimed.Status.FAILED,
+            last_error=f"No handler is registered for {claimed.name!r} jobs",
+        )
+        return False
+
+    try:
+        handler(**claimed.payload)
+    except Exception:
+        if attempts >= get_setting("MAX_ATTEMPTS"):
+            retry = {"status": claimed.Status.FAILED}
+        else:
+            delay = get_setting("RETRY_DELAY") * 2 ** (attempts - 1)
+            retry = {
+                "status": claimed.Status.PENDING,
+                "run_at": timezone.now() + timedelta(seconds=delay),
+            }
+        release_job(claimed, attempts=attempts, last_error=traceback.format_exc(), **retry)
+        return False
+
+    type(claimed).objects.using(claimed._state.db).filter(
+        pk=claimed.pk, locked_by=claimed.locked_by
+    ).delete()
+    return True
+
+
+@job("user_created")
+def user_created(user_id):
+    """
+    Notify receivers of the user_created signal outside of the signup request
+    """
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    signals.user_created.send(sender=User, user=User.objects.get(pk=user_id))
@@ -0,0 +1,112 @@
+import time
+
+from django.utils.crypto import get_random_string
+from django.core.management.base import BaseCommand
+
+from accounts.hashers import (
+    PolicyArgon2PasswordHasher,
+    PolicyPBKDF2PasswordHasher,
+    get_policy,
+)
+
+
+def time_encode(hasher, password, salt, rounds):
+    """
+    Return the average time in milliseconds to encode a password
+    """
+    start = time.perf_counter()
+    for _ in range(rounds):
+        hasher.encode(password, salt)
+    return (time.perf_counter() - start) * 1000 / rounds
+
+
+class Command(BaseCommand):
+    help = "Benchmarks the password hashers and proposes a PASSWORD_HASHER_POLICY"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target-ms",
+            type=float,
+            default=250.0,
+            help="Time budget in milliseconds for hashing a single password",
+        )
+        parser.add_argument(
+            "--rounds",
+            type=int,
+            default=3,
+            help="Number of hashes to average each measurement over",
+        )
+
+    def handle(self, target_ms, rounds, *args, **options):
+        password = get_random_string(16)
+        salt = get_random_string(22)
+        policy = {"PBKDF2_ITERATIONS": self.calibrate_pbkdf2(password, salt, target_ms, rounds)}
+
+        argon2 = PolicyArgon2PasswordHasher()
+        try:
+            argon2._load_library()
+        except ValueError:
+            self.stderr.write("argon2-cffi is not installed, skipping Argon2")
+        else:
+            policy.update(self.calibrate_argon2(argon2, password, salt, target_ms, rounds))
+
+        self.stdout.write("PASSWORD_HASHER_POLICY = {")
+        for name, value in policy.items():
+            self.stdout.write(f"    '{name}': {value},")
+        self.stdout.write("}")
+
+    def calibrate_pbkdf2(self, password, salt, target_ms, rounds):
+        """
+        PBKDF2 cost is linear in the iteration count, so scale the
+        current setting to the target
+        """
+        hasher = PolicyPBKDF2PasswordHasher()
+        elapsed = time_encode(hasher, password, salt, rounds)
+        iterations = int(hasher.iterations * target_ms / elapsed)
+        # Round to a readable value
+        iterations = max(1000, iterations // 1000 * 1000)
+
+        self.stderr.write(
+            f"PBKDF2: {hasher.iterations} iterations took {elapsed:.1f}ms"
+        )
+        return iterations
+
+    def calibrate_argon2(self, hasher, password, salt, target_ms, rounds):
+        """
+        Keep the configured memory cost and parallelism and raise the
+        time cost while it stays within the target
+        """
+        argon2 = hasher._load_library()
+        memory_cost = get_policy("ARGON2_MEMORY_COST")
+        parallelism = get_policy("ARGON2_PARALLELISM")
+
+        def elapsed_for(time_cost):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                argon2.low_level.hash_secret(
+                    password.encode(),
+                    salt.encode(),
+                    time_cost=time_cost,
+                    memory_cost=memory_cost,
+                    parallelism=parallelism,
+                    hash_len=32,
+                    type=argon2.low_level.Type.ID,
+                )
+            return (time.perf_counter() - start) * 1000 / rounds
+
+        time_cost = 1
+        elapsed = elapsed_for(time_cost)
+        while True:
+            next_elapsed = elapsed_for(time_cost + 1)
+            if next_elapsed > target_ms:
+                break
+            time_cost, elapsed = time_cost + 1, next_elapsed
+
+        self.stderr.write(
+            f"Argon2: time cost {time_cost} took {elapsed:.1f}ms"
+        )
+        return {
+            "ARGON2_TIME_COST": time_cost,
+            "ARGON2_MEMORY_COST": memory_cost,
+            "ARGON2_PARALLELISM": parallelism,
+        }
@@ -0,0 +1,295 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import socket
+import statistics
+import tempfile
+import time
+from itertools import count
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils.crypto import get_random_string
+from graphql_jwt.shortcuts import get_token
+
+SEED_PASSWORD = "loadtest-password"
+
+OPERATIONS = {
+    "me": '''
+        query Me {
+            me { id email firstName }
+        }
+    ''',
+    "users": '''
+        query Users {
+            users { id email firstName }
+        }
+    ''',
+    "user": '''
+        query User ($userId: Int!) {
+            user (userId: $userId) { id email firstName }
+        }
+    ''',
+    "login": '''
+        mutation Login ($email: String!, $password: String!) {
+            login(email: $email, password: $password) { token }
+        }
+    ''',
+    "userCreate": '''
+        mutation UserCreate ($userData: UserCreateMutationInput!) {
+            userCreate(userData: $userData) { id }
+        }
+    ''',
+}
+
+DEFAULT_MIX = "me=4,users=2,user=3,login=1,userCreate=1"
+
+
+class QuietWSGIRequestHandler(WSGIRequestHandler):
+    """
+    Request handler that does not log every request
+    """
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(listener):
+    """
+    Serve the project on an already bound socket.
+    Every worker process accepts from the same socket.
+    """
+    from django.core.wsgi import get_wsgi_application
+
+    host, port = listener.getsockname()
+    server = WSGIServer((host, port), QuietWSGIRequestHandler, bind_and_activate=False)
+    server.socket.close()
+    server.socket = listener
+    server.server_name = host
+    server.server_port = port
+    server.setup_environ()
+    server.set_app(get_wsgi_application())
+    server.serve_forever()
+
+
+def parse_mix(value):
+    """
+    Parse a mix like "me=4,users=1" into operation names and weights
+    """
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in OPERATIONS:
+            raise CommandError(f"Unknown operation {name!r}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def percentile(latencies, pct):
+    if len(latencies) < 2:
+        return latencies[0] if latencies else 0.0
+    return statistics.quantiles(latencies, n=100)[pct - 1]
+
+
+class Command(BaseCommand):
+    help = "Load tests /graphql/ under several worker counts against a seeded database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            default="1,2,4",
+            help="Comma separated worker counts to test",
+        )
+        parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds per worker count")
+        parser.add_argument("--users", type=int, default=100, help="Number of users to seed")
+        parser.add_argument(
+            "--mix",
+            default=DEFAULT_MIX,
+            help=f"Weighted operation mix (default: {DEFAULT_MIX})",
+        )
+
+    def handle(self, *args, **options):
+        worker_counts = [int(workers) for workers in options["workers"].split(",")]
+        mix = parse_mix(options["mix"])
+
+        with tempfile.TemporaryDirectory() as directory:
+            self.setup_database(os.path.join(directory, "loadtest.sqlite3"))
+            users = self.seed(options["users"])
+
+            self.stdout.write(
+                f"{'workers':>7} {'requests':>9} {'req/s':>9} {'p50 ms':>8} "
+                f"{'p95 ms':>8} {'p99 ms':>8} {'errors':>7}"
+            )
+            for workers in worker_counts:
+                result = self.run_workers(workers, users, mix, options)
+                self.stdout.write(
+                    f"{workers:>7} {result['requests']:>9} {result['throughput']:>9.1f} "
+                    f"{result['p50']:>8.1f} {result['p95']:>8.1f} {result['p99']:>8.1f} "
+                    f"{result['error_rate']:>6.1%}"
+                )
+
+    def setup_database(self, path):
+        """
+        Point the default database at a fresh SQLite file, migrate it and
+        create its cache table. The slow operation profiler is turned off
+        so its sampler does not skew the workers.
+        """
+        settings.MIDDLEWARE = [
+            middleware for middleware in settings.MIDDLEWARE
+            if middleware != "accounts.middleware.SlowOperationProfilerMiddleware"
+        ]
+        connections.close_all()
+        settings.DATABASES["default"]["NAME"] = path
+        connections["default"].settings_dict["NAME"] = path
+        call_command("migrate", verbosity=0, interactive=False)
+        call_command("createcachetable", verbosity=0)
+
+    def seed(self, total):
+        """
+        Create users sharing one password hash
+        """
+        User = get_user_model()
+        password = make_password(SEED_PASSWORD)
+        User.objects.bulk_create(
+            User(email=f"user{i}@loadtest.local", first_name=f"User{i}", password=password)
+            for i in range(total)
+        )
+        users = list(User.objects.all())
+        connections.close_all()
+        return users
+
+    def issue_tokens(self, users):
+        """
+        Issue each seeded user a token. Called at the start of every run so
+        tokens do not expire part way through a long load test.
+        """
+        return [
+            {"id": user.id, "email": user.email, "token": get_token(user)}
+            for user in users
+        ]
+
+    def run_workers(self, workers, users, mix, options):
+        """
+        Start the worker processes and drive traffic at them
+        """
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind(("127.0.0.1", 0))
+        listener.listen(1024)
+
+        context = multiprocessing.get_context("fork")
+        processes = [context.Process(target=serve, args=(listener,), daemon=True) for _ in range(workers)]
+        for process in processes:
+            process.start()
+
+        try:
+            client = LoadClient(listener.getsockname(), self.issue_tokens(users), mix)
+            return asyncio.run(client.run(options["concurrency"], options["duration"]))
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
+            listener.close()
+
+
+class LoadClient:
+    """
+    Asyncio client replaying a weighted mix of GraphQL operations
+    """
+    emails = count()
+
+    def __init__(self, address, users, mix):
+        self.host, self.port = address
+        self.users = users
+        self.names = list(mix)
+        self.weights = list(mix.values())
+        # The CSRF middleware only checks that the cookie and header agree
+        self.csrf_token = get_random_string(64)
+        self.latencies = []
+        self.errors = 0
+
+    def build(self, name):
+        """
+        Build the request body and headers for an operation
+        """
+        user = random.choice(self.users)
+        headers = {}
+        variables = {}
+
+        if name == "me":
+            headers["Authorization"] = f"JWT {user['token']}"
+        elif name == "user":
+            variables = {"userId": user["id"]}
+        elif name == "login":
+            variables = {"email": user["email"], "password": SEED_PASSWORD}
+        elif name == "userCreate":
+            variables = {"userData": {
+                "email": f"new{os.getpid()}-{next(self.emails)}@loadtest.local",
+                "password": SEED_PASSWORD,
+                "firstName": "New",
+            }}
+
+        body = json.dumps({"query": OPERATIONS[name], "variables": variables}).encode()
+        return body, headers
+
+    async def request(self, name):
+        body, headers = self.build(name)
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        head = [
+            "POST /graphql/ HTTP/1.1",
+            f"Host: localhost:{self.port}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            f"Cookie: {settings.CSRF_COOKIE_NAME}={self.csrf_token}",
+            f"X-CSRFToken: {self.csrf_token}",
+            "Connection: close",
+        ]
+        head += [f"{key}: {value}" for key, value in headers.items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        await writer.wait_closed()
+
+        status_line, _, rest = response.partition(b"\r\n")
+        _, _, content = rest.partition(b"\r\n\r\n")
+        if b" 200 " not in status_line:
+            return False
+        return "errors" not in json.loads(content)
+
+    async def worker(self, deadline):
+        while time.perf_counter() < deadline:
+            name = random.choices(self.names, self.weights)[0]
+            start = time.perf_counter()
+            try:
+                ok = await self.request(name)
+            except (OSError, ValueError):
+                ok = False
+            self.latencies.append((time.perf_counter() - start) * 1000)
+            if not ok:
+                self.errors += 1
+
+    async def run(self, concurrency, duration):
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(self.worker(deadline) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+        requests = len(self.latencies)
+        return {
+            "requests": requests,
+            "throughput": requests / elapsed,
+            "p50": percentile(self.latencies, 50),
+            "p95": percentile(self.latencies, 95),
+            "p99": percentile(self.latencies, 99),
+            "error_rate": self.errors / requests if requests else 0.0,
+        }
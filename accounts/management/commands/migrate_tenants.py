@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+
+class Command(BaseCommand):
+    help = "Migrates and creates the cache table of the default and every tenant database"
+
+    def handle(self, *args, **options):
+        aliases = [DEFAULT_DB_ALIAS] + [
+            alias for alias in settings.TENANT_DATABASES.values() if alias != DEFAULT_DB_ALIAS
+        ]
+        for alias in aliases:
+            self.stdout.write(f"Migrating {alias}")
+            call_command("migrate", database=alias, verbosity=options["verbosity"], interactive=False)
+            call_command("createcachetable", database=alias, verbosity=options["verbosity"])
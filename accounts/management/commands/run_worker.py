@@ -0,0 +1,55 @@
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.crypto import get_random_string
+
+from accounts.jobs import claim_jobs, get_setting, run_job
+from accounts.tenants import use_tenant
+
+
+class Command(BaseCommand):
+    help = "Runs queued background jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run the jobs that are due and exit instead of polling",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=get_setting("BATCH_SIZE"),
+            help="Number of jobs to claim at a time",
+        )
+        parser.add_argument(
+            "--tenant",
+            help="Run the jobs of this tenant instead of the default database",
+        )
+
+    def handle(self, tenant, *args, **options):
+        with use_tenant(tenant):
+            self.run(**options)
+
+    def run(self, once, batch_size, **options):
+        worker_id = f"{socket.gethostname()[:40]}:{os.getpid()}:{get_random_string(8)}"
+        self.stdout.write(f"Worker {worker_id} started")
+
+        while True:
+            jobs = claim_jobs(worker_id, batch_size)
+            for claimed in jobs:
+                job_id = claimed.pk
+                if run_job(claimed):
+                    self.stdout.write(f"Finished {claimed.name} job {job_id}")
+                else:
+                    self.stderr.write(
+                        f"{claimed.name} job {job_id} failed "
+                        f"(attempt {claimed.attempts}, {claimed.status})"
+                    )
+
+            if not jobs:
+                if once:
+                    break
+                time.sleep(get_setting("POLL_INTERVAL"))
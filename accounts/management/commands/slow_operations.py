@@ -0,0 +1,54 @@
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.profiling import list_profile_paths, load_profile
+
+
+class Command(BaseCommand):
+    help = "Lists profiles of slow GraphQL operations or renders one as folded stacks"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "profile_id",
+            nargs="?",
+            help="Render this profile as folded stacks for flame graph tools",
+        )
+        parser.add_argument(
+            "--sql",
+            action="store_true",
+            help="Print the SQL log of the profile instead of its stacks",
+        )
+
+    def handle(self, profile_id, sql, *args, **options):
+        if profile_id is None:
+            self.list_profiles()
+            return
+
+        try:
+            profile = load_profile(profile_id)
+        except FileNotFoundError:
+            raise CommandError(f"Profile {profile_id} does not exist")
+
+        if sql:
+            for query in profile["sql"]:
+                self.stdout.write(f"{query['duration_ms']:8.2f}ms  {query['sql']}")
+            return
+
+        for stack, count in sorted(profile["samples"].items()):
+            self.stdout.write(f"{stack} {count}")
+
+    def list_profiles(self):
+        self.stdout.write(
+            f"{'id':<20} {'time':<20} {'duration':>10} {'queries':>8} "
+            f"{'samples':>8}  operation (variables)"
+        )
+        for path in list_profile_paths():
+            profile = load_profile(path.stem)
+            timestamp = datetime.fromtimestamp(profile["timestamp"], timezone.utc)
+            self.stdout.write(
+                f"{path.stem:<20} {timestamp:%Y-%m-%d %H:%M:%S} "
+                f"{profile['duration_ms']:>8.1f}ms {len(profile['sql']):>8} "
+                f"{sum(profile['samples'].values()):>8}  "
+                f"{profile['operation_name']} ({profile['variables_hash']})"
+            )
@@ -1,20 +1,33 @@
 from django.contrib.auth.base_user import BaseUserManager
+from django.db import transaction
 from django.utils.translation import ugettext_lazy as _
 
+from accounts.jobs import enqueue
+from accounts.tenants import db_for_tenant
+
 
 class CustomUserManager(BaseUserManager):
     """
     Custom user model manager
     """
 
+    def for_tenant(self, tenant):
+        """
+        Get a manager using the tenant's database
+        """
+        return self.db_manager(db_for_tenant(tenant))
+
     def create(self, email, password, **fields):
         """
-        Create and save a user
+        Create and save a user.
+        Queues the user_created job in the same transaction.
         """
         email = self.normalize_email(email)
         user = self.model(email=email, **fields)
         user.set_password(password)
-        user.save()
+        with transaction.atomic(using=self.db):
+            user.save(using=self.db)
+            enqueue("user_created", using=self.db, user_id=user.pk)
         return user
 
     def create_user(self, email, password, **fields):
@@ -0,0 +1,114 @@
+import json
+import threading
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+from django.http import HttpResponseBadRequest
+from django.http.request import RawPostDataException
+
+from accounts.profiling import get_sampler, get_setting, hash_variables, store_profile
+from accounts.tenants import UnknownTenant, db_for_tenant, get_request_tenant, use_tenant
+
+
+class SQLRecorder:
+    """
+    Database execute wrapper that records each query and its duration
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                "sql": sql,
+                "duration_ms": (time.perf_counter() - start) * 1000,
+            })
+
+
+def get_operation(request):
+    """
+    Get the operation name and variables of a GraphQL request
+    """
+    try:
+        data = json.loads(request.body or b"{}")
+    except (RawPostDataException, ValueError):
+        data = request.POST or request.GET
+
+    if not isinstance(data, dict):
+        return "batch", data
+
+    variables = data.get("variables") or {}
+    if isinstance(variables, str):
+        try:
+            variables = json.loads(variables)
+        except ValueError:
+            pass
+
+    return data.get("operationName") or "anonymous", variables
+
+
+class SlowOperationProfilerMiddleware:
+    """
+    Sample the stack of every GraphQL request and keep the profile of
+    those slower than the configured threshold
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.path not in get_setting("PATHS"):
+            return self.get_response(request)
+
+        sampler = get_sampler()
+        thread_id = threading.get_ident()
+        recorder = SQLRecorder()
+
+        start = time.perf_counter()
+        sampler.register(thread_id)
+        try:
+            with ExitStack() as stack:
+                for alias_connection in connections.all():
+                    stack.enter_context(alias_connection.execute_wrapper(recorder))
+                response = self.get_response(request)
+        finally:
+            samples = sampler.unregister(thread_id)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        if duration_ms >= get_setting("THRESHOLD_MS"):
+            operation_name, variables = get_operation(request)
+            store_profile({
+                "timestamp": time.time(),
+                "path": request.path,
+                "operation_name": operation_name,
+                "variables_hash": hash_variables(variables),
+                "duration_ms": duration_ms,
+                "sql": recorder.queries,
+                "samples": samples,
+            })
+
+        return response
+
+
+class TenantMiddleware:
+    """
+    Route the database queries of a request to its tenant's database
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        tenant = get_request_tenant(request)
+        try:
+            db_for_tenant(tenant)
+        except UnknownTenant:
+            return HttpResponseBadRequest("Unknown tenant")
+
+        with use_tenant(tenant):
+            return self.get_response(request)
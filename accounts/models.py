@@ -26,3 +26,31 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
 
     def __repr__(self):
         return self.email
+
+
+class Job(models.Model):
+    """
+    Background job run by the run_worker command.
+    Finished jobs are deleted, failed jobs are kept for inspection.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        RUNNING = "running"
+        FAILED = "failed"
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "run_at"])]
+
+    def __repr__(self):
+        return f"{self.name} ({self.status})"
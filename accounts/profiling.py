@@ -0,0 +1,134 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.utils.crypto import salted_hmac
+
+DEFAULT_SETTINGS = {
+    "THRESHOLD_MS": 500,
+    "INTERVAL_MS": 5,
+    "MAX_PROFILES": 50,
+    "DIRECTORY": Path(settings.BASE_DIR) / "profiles",
+    "PATHS": ["/graphql/"],
+}
+
+
+def get_setting(name):
+    """
+    Get a value from the SLOW_OPERATION_PROFILER setting
+    """
+    profiler_settings = getattr(settings, "SLOW_OPERATION_PROFILER", {})
+    return profiler_settings.get(name, DEFAULT_SETTINGS[name])
+
+
+def frame_name(code):
+    return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+
+
+class StackSampler(threading.Thread):
+    """
+    Background thread that periodically samples the stacks of the threads
+    registered with it. It sleeps while no thread is registered.
+    """
+
+    def __init__(self):
+        super().__init__(name="stack-sampler", daemon=True)
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.active = {}
+
+    def register(self, thread_id):
+        with self.lock:
+            self.active[thread_id] = Counter()
+        self.wakeup.set()
+
+    def unregister(self, thread_id):
+        with self.lock:
+            samples = self.active.pop(thread_id)
+            if not self.active:
+                self.wakeup.clear()
+        return samples
+
+    def sample(self):
+        frames = sys._current_frames()
+        with self.lock:
+            for thread_id, samples in self.active.items():
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    stack.append(frame_name(frame.f_code))
+                    frame = frame.f_back
+                if stack:
+                    samples[";".join(reversed(stack))] += 1
+
+    def run(self):
+        while True:
+            self.wakeup.wait()
+            time.sleep(get_setting("INTERVAL_MS") / 1000)
+            self.sample()
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler():
+    """
+    Get the process wide sampler, starting it on first use
+    """
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None or not _sampler.is_alive():
+            _sampler = StackSampler()
+            _sampler.start()
+    return _sampler
+
+
+def hash_variables(variables):
+    """
+    Keyed hash of the operation variables, so profiles can be grouped
+    without storing the values, and variables such as passwords cannot be
+    guessed offline from the stored hash
+    """
+    encoded = json.dumps(variables or {}, sort_keys=True, default=str)
+    return salted_hmac("accounts.profiling", encoded).hexdigest()[:16]
+
+
+def store_profile(profile):
+    """
+    Write a profile to the profile directory and delete the oldest profiles
+    beyond MAX_PROFILES
+    """
+    directory = Path(get_setting("DIRECTORY"))
+    directory.mkdir(parents=True, exist_ok=True)
+
+    profile_id = str(time.time_ns())
+    path = directory / f"{profile_id}.json"
+    tmp_path = directory / f".{profile_id}.tmp"
+    tmp_path.write_text(json.dumps(profile))
+    os.replace(tmp_path, path)
+
+    for old_path in list_profile_paths()[get_setting("MAX_PROFILES"):]:
+        old_path.unlink(missing_ok=True)
+
+    return profile_id
+
+
+def list_profile_paths():
+    """
+    List stored profile paths, newest first
+    """
+    directory = Path(get_setting("DIRECTORY"))
+    if not directory.exists():
+        return []
+    return sorted(directory.glob("*.json"), reverse=True)
+
+
+def load_profile(profile_id):
+    path = Path(get_setting("DIRECTORY")) / f"{profile_id}.json"
+    return json.loads(path.read_text())
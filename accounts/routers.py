@@ -0,0 +1,24 @@
+from accounts.tenants import get_current_db
+
+
+class TenantRouter:
+    """
+    Route every query to the database of the current tenant.
+    Queries through a model instance stay on the database it came from.
+    Each tenant database holds the full schema.
+    """
+
+    def db_for(self, hints):
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return get_current_db()
+
+    def db_for_read(self, model, **hints):
+        return self.db_for(hints)
+
+    def db_for_write(self, model, **hints):
+        return self.db_for(hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return obj1._state.db == obj2._state.db
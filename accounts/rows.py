@@ -0,0 +1,44 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass
+class UserRow:
+    """
+    Lightweight read only user.
+    Holds only the fields exposed by UserType, without the model instance
+    state, so large lists of users allocate far fewer objects.
+    """
+    __slots__ = (
+        "id",
+        "last_login",
+        "is_superuser",
+        "email",
+        "first_name",
+        "last_name",
+        "occupation",
+        "company",
+        "date_joined",
+    )
+
+    id: int
+    last_login: Optional[datetime]
+    is_superuser: bool
+    email: str
+    first_name: str
+    last_name: str
+    occupation: str
+    company: str
+    date_joined: datetime
+
+    @property
+    def pk(self):
+        return self.id
+
+    @classmethod
+    def from_queryset(cls, queryset):
+        """
+        Build rows from a user queryset
+        """
+        return [cls(*values) for values in queryset.values_list(*cls.__slots__)]
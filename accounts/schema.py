@@ -1,9 +1,28 @@
 import graphene
 import graphql_jwt
+from django.conf import settings
+from django.contrib.auth.models import Group, Permission
+from django.db.models import Prefetch
+from graphene.utils.str_converters import to_snake_case
 from graphene_django import DjangoObjectType
+from graphql.language import FieldNode, FragmentSpreadNode, InlineFragmentNode
 from graphql_jwt.decorators import login_required
 
+from .decorators import idempotent
 from .models import CustomUser as User
+from .rows import UserRow
+
+
+class GroupType(DjangoObjectType):
+    class Meta:
+        model = Group
+        fields = ["id", "name"]
+
+
+class PermissionType(DjangoObjectType):
+    class Meta:
+        model = Permission
+        fields = ["id", "name", "codename"]
 
 
 class UserType(DjangoObjectType):
@@ -11,6 +30,64 @@ class UserType(DjangoObjectType):
         model = User
         exclude = ["password"]
 
+    @classmethod
+    def is_type_of(cls, root, info):
+        if isinstance(root, UserRow):
+            return True
+        return super().is_type_of(root, info)
+
+
+def get_selections(info, selection_sets):
+    """
+    Map the field names in selection sets to the selection sets of every
+    selection of that field. Fragments are expanded in place, and a field
+    selected more than once, under aliases or through fragments, keeps all
+    of its selection sets.
+    """
+    selections = {}
+
+    def collect(selection_set):
+        if selection_set is None:
+            return
+
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                selections.setdefault(selection.name.value, []).append(selection.selection_set)
+            elif isinstance(selection, InlineFragmentNode):
+                collect(selection.selection_set)
+            elif isinstance(selection, FragmentSpreadNode):
+                collect(info.fragments[selection.name.value].selection_set)
+
+    for selection_set in selection_sets:
+        collect(selection_set)
+
+    return selections
+
+
+def get_user_prefetches(info):
+    """
+    Get prefetches for the many to many fields selected on the users in a
+    query. Each prefetch only loads the columns that were asked for, so a
+    page of users resolves in a constant number of queries.
+    """
+    selections = get_selections(info, [field_node.selection_set for field_node in info.field_nodes])
+
+    prefetches = []
+    for name, selection_sets in selections.items():
+        field_name = to_snake_case(name)
+        if field_name not in ("groups", "user_permissions"):
+            continue
+
+        model = User._meta.get_field(field_name).related_model
+        concrete_fields = {field.name for field in model._meta.concrete_fields}
+        only = {"id"} | {
+            to_snake_case(selected) for selected in get_selections(info, selection_sets)
+            if to_snake_case(selected) in concrete_fields
+        }
+        prefetches.append(Prefetch(field_name, queryset=model.objects.only(*sorted(only))))
+
+    return prefetches
+
 
 class UserQuery(graphene.ObjectType):
     me = graphene.Field(UserType, required=True)
@@ -28,9 +105,14 @@ class UserQuery(graphene.ObjectType):
     @staticmethod
     def resolve_users(root, info, **kwargs):
         """
-        Resolves all users
+        Resolves all users.
+        Uses lightweight rows when enabled and no related fields are selected.
         """
-        return User.objects.all()
+        prefetches = get_user_prefetches(info)
+        if prefetches or not getattr(settings, "USERS_QUERY_USE_ROWS", False):
+            return User.objects.prefetch_related(*prefetches)
+
+        return UserRow.from_queryset(User.objects.all())
 
     @staticmethod
     def resolve_user(root, info, user_id, **kwargs):
@@ -63,8 +145,10 @@ class UserCreate(graphene.Mutation):
         Input argumants for creating the user
         """
         user_data = UserCreateMutationInput(required=True)
+        idempotency_key = graphene.String()
 
     @staticmethod
+    @idempotent
     def mutate(root, info, user_data=None):
         """
         Create the user and return specified attribtes
@@ -81,3 +165,5 @@ class UserMutation(graphene.ObjectType):
     user_create = UserCreate.Field()
     login = graphql_jwt.ObtainJSONWebToken.Field()
     verify_token = graphql_jwt.Verify.Field()
+    refresh_token = graphql_jwt.Refresh.Field()
+    revoke_token = graphql_jwt.Revoke.Field()
@@ -0,0 +1,26 @@
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+from django.utils.translation import gettext as _
+from graphql_jwt.exceptions import JSONWebTokenError
+from graphql_jwt.refresh_token.signals import refresh_token_revoked, refresh_token_rotated
+
+# Sent by the job worker after a user is created. Receivers get the user.
+user_created = Signal()
+
+
+@receiver(refresh_token_rotated)
+def revoke_rotated_refresh_token(sender, request, refresh_token, **kwargs):
+    """
+    Revoke the old refresh token once a new one has been issued.
+    The revoke only succeeds if the token is still live, so of two
+    concurrent refreshes with the same token only one gets a new token.
+    """
+    revoked = timezone.now()
+    updated = type(refresh_token).objects.using(refresh_token._state.db).filter(
+        pk=refresh_token.pk, revoked__isnull=True
+    ).update(revoked=revoked)
+    if not updated:
+        raise JSONWebTokenError(_("Invalid refresh token"))
+
+    refresh_token.revoked = revoked
+    refresh_token_revoked.send(sender=type(refresh_token), request=request, refresh_token=refresh_token)
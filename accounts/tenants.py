@@ -0,0 +1,83 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from graphql_jwt import utils
+from graphql_jwt.exceptions import JSONWebTokenError
+
+_current_db = ContextVar("current_tenant_db", default=DEFAULT_DB_ALIAS)
+
+
+class UnknownTenant(Exception):
+    """
+    Raised for a tenant key that is not in TENANT_DATABASES
+    """
+
+
+def db_for_tenant(tenant):
+    """
+    Get the database alias of a tenant.
+    Requests without a tenant use the default database.
+    """
+    if not tenant:
+        return DEFAULT_DB_ALIAS
+
+    try:
+        return getattr(settings, "TENANT_DATABASES", {})[tenant]
+    except KeyError:
+        raise UnknownTenant(tenant)
+
+
+def tenant_for_db(alias):
+    """
+    Get the tenant key of a database alias, None for the default database
+    """
+    for tenant, tenant_alias in getattr(settings, "TENANT_DATABASES", {}).items():
+        if tenant_alias == alias:
+            return tenant
+    return None
+
+
+def get_current_db():
+    return _current_db.get()
+
+
+@contextmanager
+def use_tenant(tenant):
+    """
+    Route database access in this context to the tenant's database
+    """
+    token = _current_db.set(db_for_tenant(tenant))
+    try:
+        yield
+    finally:
+        _current_db.reset(token)
+
+
+def jwt_payload(user, context=None):
+    """
+    JWT payload with the tenant of the user's database as a claim
+    """
+    payload = utils.jwt_payload(user, context)
+    tenant = tenant_for_db(user._state.db)
+    if tenant is not None:
+        payload["tenant"] = tenant
+    return payload
+
+
+def get_request_tenant(request):
+    """
+    Get the tenant key from the tenant claim of the request's JWT, or else
+    from the X-Tenant header. A valid token always decides the tenant, so
+    the header cannot move its user to another tenant. Requests without a
+    JWT, such as refreshToken and revokeToken, rely on the header.
+    """
+    token = utils.get_http_authorization(request)
+    if token:
+        try:
+            return utils.get_payload(token, request).get("tenant")
+        except JSONWebTokenError:
+            pass
+
+    return request.META.get("HTTP_X_TENANT")
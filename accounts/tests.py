@@ -1,7 +1,28 @@
+import hashlib
 import json
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from graphene_django.utils import GraphQLTestCase
+from graphql_jwt.refresh_token.shortcuts import get_refresh_token
+from graphql_jwt.refresh_token.utils import get_refresh_token_model
+
+from accounts import jobs, signals
+from accounts.decorators import hash_arguments, idempotent
+from accounts.management.commands.loadtest import parse_mix
+from accounts.models import Job
+from accounts.rows import UserRow
+from accounts.schema import UserType
+from accounts.profiling import hash_variables, list_profile_paths, load_profile
+from accounts.tenants import UnknownTenant, use_tenant
 
 
 class UserManagerTests(TestCase):
@@ -214,6 +235,175 @@ class TestUserQueries(GraphQLTestCase):
             "email": new_user.email
         })
 
+    def test_users_query_prefetches_groups_and_permissions(self):
+        """
+        Test that groups and permissions are fetched in a constant number of
+        queries however many users are returned
+        """
+        group = Group.objects.create(name="Editors")
+        permission = Permission.objects.get(codename="add_group")
+
+        for i in range(5):
+            user = self.User.objects.create_user(
+                email=f"user{i}@email.com",
+                password="strong3232",
+                first_name="Sabba"
+            )
+            user.groups.add(group)
+            user.user_permissions.add(permission)
+
+        with self.assertNumQueries(3):
+            response = self.query(
+                '''
+                query UsersWithPermissionsQuery {
+                    users {
+                        id
+                        groups {
+                            name
+                        }
+                        ...UserPermissions
+                    }
+                }
+
+                fragment UserPermissions on UserType {
+                    userPermissions {
+                        codename
+                    }
+                }
+                ''',
+                operation_name="UsersWithPermissionsQuery"
+            )
+
+        self.assertResponseNoErrors(response)
+        content = json.loads(response.content)
+
+        self.assertEqual(len(content["data"]["users"]), 5)
+        for user_data in content["data"]["users"]:
+            self.assertListEqual(user_data["groups"], [{"name": "Editors"}])
+            self.assertListEqual(user_data["userPermissions"], [{"codename": "add_group"}])
+
+    def create_users_with_group(self):
+        group = Group.objects.create(name="Editors")
+        for i in range(5):
+            user = self.User.objects.create_user(
+                email=f"user{i}@email.com",
+                password="strong3232",
+                first_name="Sabba"
+            )
+            user.groups.add(group)
+        return group
+
+    def test_users_query_prefetches_aliased_groups(self):
+        """
+        Test that selecting groups under several aliases loads every
+        selected column in the one prefetch query
+        """
+        group = self.create_users_with_group()
+
+        with self.assertNumQueries(2):
+            response = self.query(
+                '''
+                query AliasedGroupsQuery {
+                    users {
+                        a: groups {
+                            name
+                        }
+                        b: groups {
+                            id
+                        }
+                    }
+                }
+                ''',
+                operation_name="AliasedGroupsQuery"
+            )
+
+        self.assertResponseNoErrors(response)
+        for user_data in json.loads(response.content)["data"]["users"]:
+            self.assertListEqual(user_data["a"], [{"name": "Editors"}])
+            self.assertListEqual(user_data["b"], [{"id": str(group.id)}])
+
+    def test_users_query_prefetches_groups_repeated_in_fragment(self):
+        """
+        Test that a fragment repeating the groups field does not drop the
+        columns selected outside it
+        """
+        group = self.create_users_with_group()
+
+        with self.assertNumQueries(2):
+            response = self.query(
+                '''
+                query RepeatedGroupsQuery {
+                    users {
+                        groups {
+                            name
+                        }
+                        ...UserGroupIds
+                    }
+                }
+
+                fragment UserGroupIds on UserType {
+                    groups {
+                        id
+                    }
+                }
+                ''',
+                operation_name="RepeatedGroupsQuery"
+            )
+
+        self.assertResponseNoErrors(response)
+        for user_data in json.loads(response.content)["data"]["users"]:
+            self.assertListEqual(user_data["groups"], [{"name": "Editors", "id": str(group.id)}])
+
+    def test_users_query_rows_match_model_instances(self):
+        """
+        Test that resolving users from lightweight rows returns the same data
+        as resolving them from model instances
+        """
+        for i in range(3):
+            self.User.objects.create_user(
+                email=f"user{i}@email.com",
+                password="strong3232",
+                first_name="Sabba",
+                company="Kwale Tech"
+            )
+        query = '''
+            query AllUsersQuery {
+                users {
+                    id
+                    lastLogin
+                    isSuperuser
+                    email
+                    firstName
+                    lastName
+                    occupation
+                    company
+                    dateJoined
+                }
+            }
+            '''
+
+        with self.settings(USERS_QUERY_USE_ROWS=True):
+            rows_response = self.query(query, operation_name="AllUsersQuery")
+        with self.settings(USERS_QUERY_USE_ROWS=False):
+            models_response = self.query(query, operation_name="AllUsersQuery")
+
+        self.assertResponseNoErrors(rows_response)
+        self.assertResponseNoErrors(models_response)
+        self.assertEqual(len(json.loads(rows_response.content)["data"]["users"]), 3)
+        self.assertDictEqual(json.loads(rows_response.content), json.loads(models_response.content))
+
+    def test_user_row_fields_match_user_type(self):
+        """
+        Test that user rows hold every concrete field exposed by UserType,
+        so new model fields cannot be missed in row mode
+        """
+        exposed_fields = tuple(
+            field.attname for field in self.User._meta.concrete_fields
+            if field.name in UserType._meta.fields
+        )
+
+        self.assertTupleEqual(UserRow.__slots__, exposed_fields)
+
     def test_user_query_does_not_return_password(self):
         """
         Test that the users password hash cannot be queried for
@@ -279,6 +469,151 @@ class TestUserMutations(GraphQLTestCase):
             "firstName": created_user.first_name,
         })
 
+    def create_user_with_key(self, idempotency_key=None, headers=None):
+        return self.query(
+            '''
+            mutation UserCreateMutation ($userData: UserCreateMutationInput!, $idempotencyKey: String) {
+                userCreate(userData: $userData, idempotencyKey: $idempotencyKey) {
+                    id
+                }
+            }
+            ''',
+            operation_name="UserCreateMutation",
+            variables={
+                "userData": {
+                    "email": "ae@email.com",
+                    "password": "strong221",
+                    "firstName": "Pamilerin"
+                },
+                "idempotencyKey": idempotency_key
+            },
+            headers=headers
+        )
+
+    def test_user_create_retry_with_idempotency_key(self):
+        """
+        Test that retrying with the same idempotency key argument returns the
+        stored result instead of creating the user again
+        """
+        cache.clear()
+        first_response = self.create_user_with_key("signup-1")
+        retry_response = self.create_user_with_key("signup-1")
+
+        self.assertResponseNoErrors(first_response)
+        self.assertResponseNoErrors(retry_response)
+        self.assertEqual(
+            json.loads(first_response.content)["data"]["userCreate"]["id"],
+            json.loads(retry_response.content)["data"]["userCreate"]["id"]
+        )
+        self.assertEqual(self.User.objects.count(), 1)
+
+    def test_user_create_retry_with_idempotency_header(self):
+        """
+        Test that the idempotency key can be sent as a header
+        """
+        cache.clear()
+        headers = {"HTTP_IDEMPOTENCY_KEY": "signup-2"}
+        first_response = self.create_user_with_key(headers=headers)
+        retry_response = self.create_user_with_key(headers=headers)
+
+        self.assertResponseNoErrors(first_response)
+        self.assertResponseNoErrors(retry_response)
+        self.assertEqual(self.User.objects.count(), 1)
+
+    def test_idempotency_key_reused_with_different_arguments(self):
+        """
+        Test that reusing a key with different user data is an error and
+        does not return the stored result
+        """
+        cache.clear()
+        self.assertResponseNoErrors(self.create_user_with_key("signup-3"))
+
+        response = self.query(
+            '''
+            mutation UserCreateMutation ($userData: UserCreateMutationInput!, $idempotencyKey: String) {
+                userCreate(userData: $userData, idempotencyKey: $idempotencyKey) {
+                    id
+                }
+            }
+            ''',
+            operation_name="UserCreateMutation",
+            variables={
+                "userData": {
+                    "email": "other@email.com",
+                    "password": "strong221",
+                    "firstName": "Pamilerin"
+                },
+                "idempotencyKey": "signup-3"
+            }
+        )
+
+        self.assertResponseHasErrors(response)
+        self.assertIsNone(json.loads(response.content)["data"]["userCreate"])
+        self.assertEqual(self.User.objects.count(), 1)
+
+    def test_idempotency_key_in_flight(self):
+        """
+        Test that a retry while the first request is still running is an
+        error instead of running the mutation again
+        """
+        cache.clear()
+        cache_key = "idempotency:default:anonymous:userCreate:signup-4"
+        arguments_hash = hash_arguments({"user_data": {
+            "email": "ae@email.com",
+            "password": "strong221",
+            "first_name": "Pamilerin"
+        }})
+        cache.add(cache_key, (arguments_hash, None))
+
+        response = self.create_user_with_key("signup-4")
+
+        self.assertResponseHasErrors(response)
+        self.assertIn("in progress", json.loads(response.content)["errors"][0]["message"])
+        self.assertFalse(self.User.objects.exists())
+
+    def test_idempotency_keys_are_scoped_to_the_user(self):
+        """
+        Test that two users sending the same key and arguments each run
+        the mutation
+        """
+        cache.clear()
+        calls = []
+
+        @idempotent
+        def mutate(root, info, **kwargs):
+            calls.append(info.context.user)
+            return info.context.user.pk
+
+        for email in ("one@email.com", "two@email.com"):
+            user = self.User.objects.create_user(email=email, password="strong221", first_name="Abbas")
+            info = SimpleNamespace(field_name="dummy", context=SimpleNamespace(META={}, user=user))
+
+            self.assertEqual(mutate(None, info, idempotency_key="shared", value=1), user.pk)
+
+        self.assertEqual(len(calls), 2)
+
+    def test_idempotency_key_claimed_again_after_expiry(self):
+        """
+        Test that an entry expiring between the claim and the read is
+        claimed again instead of reported as in progress
+        """
+        cache.clear()
+        info = SimpleNamespace(field_name="dummy", context=SimpleNamespace(META={}, user=None))
+
+        @idempotent
+        def mutate(root, info, **kwargs):
+            return "result"
+
+        with mock.patch.object(cache, "add", side_effect=[False, True]):
+            self.assertEqual(mutate(None, info, idempotency_key="expiring"), "result")
+
+    def test_user_create_retry_without_idempotency_key(self):
+        """
+        Test that a retry without a key fails on the unique email
+        """
+        self.assertResponseNoErrors(self.create_user_with_key())
+        self.assertResponseHasErrors(self.create_user_with_key())
+
 
 class TestUserAuthentication(GraphQLTestCase):
     User = get_user_model()
@@ -297,6 +632,7 @@ class TestUserAuthentication(GraphQLTestCase):
             mutation UserLogin ($email: String!, $password: String!) {
                 login(email: $email, password: $password) {
                     token
+                    refreshToken
                 }
             }
             ''',
@@ -309,6 +645,24 @@ class TestUserAuthentication(GraphQLTestCase):
 
         return login_response
 
+    def refresh_user_token(self, refresh_token):
+        refresh_response = self.query(
+            '''
+            mutation UserRefresh ($refreshToken: String!) {
+                refreshToken(refreshToken: $refreshToken) {
+                    token
+                    refreshToken
+                }
+            }
+            ''',
+            operation_name="UserRefresh",
+            variables={
+                "refreshToken": refresh_token
+            }
+        )
+
+        return refresh_response
+
     def setUp(self) -> None:
         """
         Create a user that will be authenticated
@@ -428,3 +782,524 @@ class TestUserAuthentication(GraphQLTestCase):
             })
 
         self.assertResponseHasErrors(me_response)
+
+    def test_user_can_refresh_login_token(self):
+        """
+        Test that a refresh token can be exchanged for a new token
+        and a new refresh token
+        """
+        login_response = self.login_user()
+        self.assertResponseNoErrors(login_response)
+        content = json.loads(login_response.content)
+        refresh_token = content["data"]["login"]["refreshToken"]
+
+        refresh_response = self.refresh_user_token(refresh_token)
+        self.assertResponseNoErrors(refresh_response)
+        content = json.loads(refresh_response.content)
+
+        self.assertIsNotNone(content["data"]["refreshToken"]["token"])
+        self.assertNotEqual(content["data"]["refreshToken"]["refreshToken"], refresh_token)
+
+    def test_refresh_token_cannot_be_reused(self):
+        """
+        Test that a refresh token is revoked once it has been rotated
+        """
+        login_response = self.login_user()
+        content = json.loads(login_response.content)
+        refresh_token = content["data"]["login"]["refreshToken"]
+
+        self.assertResponseNoErrors(self.refresh_user_token(refresh_token))
+        self.assertResponseHasErrors(self.refresh_user_token(refresh_token))
+
+    def test_concurrently_revoked_refresh_token_cannot_be_rotated(self):
+        """
+        Test that a refresh token revoked between its lookup and its
+        rotation does not issue a new refresh token
+        """
+        login_response = self.login_user()
+        content = json.loads(login_response.content)
+        refresh_token = content["data"]["login"]["refreshToken"]
+
+        def get_then_revoke(token, context=None):
+            refresh_token_obj = get_refresh_token(token, context)
+            get_refresh_token_model().objects.filter(pk=refresh_token_obj.pk).update(revoked=timezone.now())
+            return refresh_token_obj
+
+        with mock.patch("graphql_jwt.refresh_token.mixins.get_refresh_token", get_then_revoke):
+            response = self.refresh_user_token(refresh_token)
+
+        self.assertResponseHasErrors(response)
+        self.assertEqual(get_refresh_token_model().objects.filter(revoked__isnull=True).count(), 0)
+
+    def test_user_can_revoke_refresh_token(self):
+        """
+        Test that a revoked refresh token cannot be used
+        """
+        login_response = self.login_user()
+        content = json.loads(login_response.content)
+        refresh_token = content["data"]["login"]["refreshToken"]
+
+        revoke_response = self.query(
+            '''
+            mutation UserRevoke ($refreshToken: String!) {
+                revokeToken(refreshToken: $refreshToken) {
+                    revoked
+                }
+            }
+            ''',
+            operation_name="UserRevoke",
+            variables={
+                "refreshToken": refresh_token
+            }
+        )
+
+        self.assertResponseNoErrors(revoke_response)
+        self.assertResponseHasErrors(self.refresh_user_token(refresh_token))
+
+    def test_cleartokens_deletes_revoked_tokens(self):
+        """
+        Test that revoked refresh tokens are removed in bulk
+        """
+        login_response = self.login_user()
+        content = json.loads(login_response.content)
+        self.refresh_user_token(content["data"]["login"]["refreshToken"])
+
+        call_command("cleartokens", "--expired", stdout=StringIO())
+
+        self.assertEqual(get_refresh_token_model().objects.count(), 1)
+
+
+class TestPasswordHasherPolicy(GraphQLTestCase):
+    User = get_user_model()
+    user_details = {
+        "email": "ae@email.com",
+        "password": "strong22",
+        "first_name": "Abbas"
+    }
+    """
+    Testing the configurable password hasher policy
+    """
+
+    @override_settings(PASSWORD_HASHER_POLICY={"PBKDF2_ITERATIONS": 1000})
+    def test_password_is_hashed_with_policy(self):
+        """
+        Test that new passwords use the iterations from the policy
+        """
+        user = self.User.objects.create_user(**self.user_details)
+
+        self.assertTrue(user.password.startswith("pbkdf2_sha256$1000$"))
+
+    def test_password_is_rehashed_on_login(self):
+        """
+        Test that a stored hash is upgraded to the current policy on login
+        """
+        with self.settings(PASSWORD_HASHER_POLICY={"PBKDF2_ITERATIONS": 1000}):
+            user = self.User.objects.create_user(**self.user_details)
+
+        with self.settings(PASSWORD_HASHER_POLICY={"PBKDF2_ITERATIONS": 2000}):
+            response = self.query(
+                '''
+                mutation UserLogin ($email: String!, $password: String!) {
+                    login(email: $email, password: $password) {
+                        token
+                    }
+                }
+                ''',
+                operation_name="UserLogin",
+                variables={
+                    "email": self.user_details["email"],
+                    "password": self.user_details["password"]
+                }
+            )
+
+        self.assertResponseNoErrors(response)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith("pbkdf2_sha256$2000$"))
+
+    def test_calibrate_hashers_proposes_policy(self):
+        """
+        Test that the calibration command prints a policy
+        """
+        out = StringIO()
+        call_command("calibrate_hashers", "--target-ms", "1", "--rounds", "1", stdout=out, stderr=StringIO())
+
+        self.assertIn("PASSWORD_HASHER_POLICY", out.getvalue())
+        self.assertIn("'PBKDF2_ITERATIONS': ", out.getvalue())
+
+
+class TestLoadTestMix(TestCase):
+    """
+    Testing the load test operation mix
+    """
+
+    def test_parse_mix(self):
+        """
+        Test that weights are parsed and default to one
+        """
+        self.assertDictEqual(parse_mix("me=4,users"), {"me": 4, "users": 1})
+
+        with self.assertRaises(CommandError):
+            parse_mix("me=4,unknown=1")
+
+
+class TestSlowOperationProfiler(GraphQLTestCase):
+    User = get_user_model()
+    """
+    Testing the slow operation profiler
+    """
+
+    def setUp(self) -> None:
+        """
+        Profile every request into a temporary directory
+        """
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        profiler_settings = self.settings(SLOW_OPERATION_PROFILER={
+            "THRESHOLD_MS": 0,
+            "INTERVAL_MS": 1,
+            "MAX_PROFILES": 2,
+            "DIRECTORY": directory.name,
+        })
+        profiler_settings.enable()
+        self.addCleanup(profiler_settings.disable)
+
+    def query_user(self, user_id):
+        return self.query(
+            '''
+            query SingleUserQuery ($userId: Int!) {
+                user (userId: $userId) {
+                    id
+                }
+            }
+            ''',
+            operation_name="SingleUserQuery",
+            variables={"userId": user_id}
+        )
+
+    def test_slow_operation_is_profiled(self):
+        """
+        Test that the operation, variables hash and SQL log are stored
+        """
+        user = self.User.objects.create_user(
+            email="ae@email.com",
+            password="strong22",
+            first_name="Abbas"
+        )
+        self.assertResponseNoErrors(self.query_user(user.id))
+
+        profile_paths = list_profile_paths()
+        self.assertEqual(len(profile_paths), 1)
+
+        profile = load_profile(profile_paths[0].stem)
+        self.assertEqual(profile["operation_name"], "SingleUserQuery")
+        self.assertEqual(profile["variables_hash"], hash_variables({"userId": user.id}))
+        self.assertNotEqual(
+            profile["variables_hash"],
+            hashlib.sha256(json.dumps({"userId": user.id}).encode()).hexdigest()[:16]
+        )
+        self.assertEqual(len(profile["sql"]), 1)
+
+    def test_profiles_are_bounded(self):
+        """
+        Test that only the newest profiles are kept
+        """
+        for user_id in range(3):
+            self.query_user(user_id)
+
+        self.assertEqual(len(list_profile_paths()), 2)
+
+    def test_slow_operations_command(self):
+        """
+        Test that profiles can be listed and rendered
+        """
+        self.query_user(1)
+        profile_id = list_profile_paths()[0].stem
+
+        out = StringIO()
+        call_command("slow_operations", stdout=out)
+        self.assertIn(profile_id, out.getvalue())
+        self.assertIn("SingleUserQuery", out.getvalue())
+
+        out = StringIO()
+        call_command("slow_operations", profile_id, "--sql", stdout=out)
+        self.assertIn("SELECT", out.getvalue())
+
+        with self.assertRaises(CommandError):
+            call_command("slow_operations", "missing")
+
+
+class TestJobQueue(TestCase):
+    User = get_user_model()
+    """
+    Testing the background job queue
+    """
+
+    def run_worker(self):
+        call_command("run_worker", "--once", stdout=StringIO(), stderr=StringIO())
+
+    def test_user_create_enqueues_job(self):
+        """
+        Test that creating a user queues the user_created job, and that the
+        worker sends the user_created signal and deletes the job
+        """
+        user = self.User.objects.create_user(
+            email="ae@email.com",
+            password="strong22",
+            first_name="Abbas"
+        )
+        self.assertEqual(Job.objects.get().payload, {"user_id": user.id})
+
+        received = []
+
+        def receiver(sender, user, **kwargs):
+            received.append(user)
+
+        signals.user_created.connect(receiver)
+        self.addCleanup(signals.user_created.disconnect, receiver)
+        self.run_worker()
+
+        self.assertListEqual(received, [user])
+        self.assertFalse(Job.objects.exists())
+
+    def test_claimed_jobs_are_not_claimed_again(self):
+        """
+        Test that a claimed job is not handed to a second worker
+        """
+        jobs.enqueue("noop")
+
+        self.assertEqual(len(jobs.claim_jobs("worker-1", 10)), 1)
+        self.assertEqual(len(jobs.claim_jobs("worker-2", 10)), 0)
+
+    @override_settings(JOB_QUEUE={"MAX_ATTEMPTS": 2, "RETRY_DELAY": 0})
+    def test_failed_jobs_are_retried(self):
+        """
+        Test that a failing job is retried until it runs out of attempts
+        """
+
+        def failing():
+            raise RuntimeError("Job failed")
+
+        jobs.handlers["failing"] = failing
+        self.addCleanup(jobs.handlers.pop, "failing")
+        job = jobs.enqueue("failing")
+
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertIn("RuntimeError", job.last_error)
+
+    def test_unknown_jobs_fail_at_once(self):
+        """
+        Test that a job without a handler is not retried
+        """
+        job = jobs.enqueue("missing")
+
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertIn("missing", job.last_error)
+
+    def test_reclaimed_job_is_not_overwritten(self):
+        """
+        Test that a worker cannot change a job another worker reclaimed
+        """
+        job = jobs.enqueue("missing")
+        claimed = jobs.claim_jobs("worker-1", 10)[0]
+        Job.objects.filter(pk=job.pk).update(locked_by="worker-2")
+
+        jobs.run_job(claimed)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.RUNNING)
+        self.assertEqual(job.locked_by, "worker-2")
+        self.assertEqual(job.attempts, 1)
+
+    @override_settings(JOB_QUEUE={"MAX_ATTEMPTS": 2, "LOCK_TIMEOUT": 60})
+    def test_stale_jobs_count_reclaims_as_attempts(self):
+        """
+        Test that reclaiming a job whose worker stopped responding counts as
+        an attempt, and that the job fails once it runs out of attempts
+        """
+        job = jobs.enqueue("noop")
+        stale = timezone.now() - timedelta(minutes=5)
+
+        jobs.claim_jobs("worker-1", 10)
+        Job.objects.filter(pk=job.pk).update(locked_at=stale)
+        self.assertEqual(len(jobs.claim_jobs("worker-2", 10)), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+
+        Job.objects.filter(pk=job.pk).update(locked_at=stale)
+        self.assertListEqual(jobs.claim_jobs("worker-3", 10), [])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertIn("stopped responding", job.last_error)
+
+
+class TestTenantSharding(GraphQLTestCase):
+    User = get_user_model()
+    databases = {"default", "tenant_example"}
+    user_details = {
+        "email": "ae@email.com",
+        "password": "strong22",
+        "first_name": "Abbas"
+    }
+    """
+    Testing routing users to their tenant's database
+    """
+
+    def login_user(self, headers=None):
+        return self.query(
+            '''
+            mutation UserLogin ($email: String!, $password: String!) {
+                login(email: $email, password: $password) {
+                    token
+                }
+            }
+            ''',
+            operation_name="UserLogin",
+            variables={
+                "email": self.user_details["email"],
+                "password": self.user_details["password"]
+            },
+            headers=headers
+        )
+
+    def test_create_user_for_tenant(self):
+        """
+        Test that a tenant's user and its job are saved in the tenant database only
+        """
+        user = self.User.objects.for_tenant("example").create_user(**self.user_details)
+
+        self.assertEqual(user._state.db, "tenant_example")
+        self.assertTrue(self.User.objects.using("tenant_example").filter(pk=user.pk).exists())
+        self.assertTrue(Job.objects.using("tenant_example").exists())
+        self.assertFalse(self.User.objects.exists())
+        self.assertFalse(Job.objects.exists())
+
+        with self.assertRaises(UnknownTenant):
+            self.User.objects.for_tenant("missing")
+
+    def test_user_create_mutation_uses_tenant_header(self):
+        """
+        Test that the X-Tenant header routes the mutation to the tenant database
+        """
+        response = self.query(
+            '''
+            mutation UserCreateMutation ($userData: UserCreateMutationInput!) {
+                userCreate(userData: $userData) {
+                    id
+                }
+            }
+            ''',
+            operation_name="UserCreateMutation",
+            variables={"userData": {
+                "email": "ae@email.com",
+                "password": "strong221",
+                "firstName": "Pamilerin"
+            }},
+            headers={"HTTP_X_TENANT": "example"}
+        )
+
+        self.assertResponseNoErrors(response)
+        self.assertEqual(self.User.objects.using("tenant_example").count(), 1)
+        self.assertFalse(self.User.objects.exists())
+
+    def test_token_tenant_claim_selects_database(self):
+        """
+        Test that a token issued to a tenant's user authenticates against the
+        tenant database, even when the same email exists in another tenant
+        """
+        self.User.objects.create_user(**dict(self.user_details, first_name="Default"))
+        self.User.objects.for_tenant("example").create_user(**self.user_details)
+
+        login_response = self.login_user(headers={"HTTP_X_TENANT": "example"})
+        self.assertResponseNoErrors(login_response)
+        user_token = json.loads(login_response.content)["data"]["login"]["token"]
+
+        me_query = '''
+            query MeQuery {
+                me {
+                    firstName
+                }
+            }
+            '''
+        me_response = self.query(me_query, headers={
+            "HTTP_AUTHORIZATION": f"JWT {user_token}"
+        })
+        self.assertResponseNoErrors(me_response)
+        self.assertEqual(json.loads(me_response.content)["data"]["me"]["firstName"], "Abbas")
+
+        """
+        Ensure the header cannot move the token to another tenant
+        """
+        me_response = self.query(me_query, headers={
+            "HTTP_AUTHORIZATION": f"JWT {user_token}",
+            "HTTP_X_TENANT": ""
+        })
+        self.assertEqual(json.loads(me_response.content)["data"]["me"]["firstName"], "Abbas")
+
+    def test_worker_claims_tenant_jobs(self):
+        """
+        Test that a worker for a tenant claims the jobs in its database only
+        """
+        jobs.enqueue("noop", using="tenant_example")
+
+        self.assertListEqual(jobs.claim_jobs("worker-1", 10), [])
+        with use_tenant("example"):
+            claimed = jobs.claim_jobs("worker-1", 10)
+
+        self.assertEqual(len(claimed), 1)
+        self.assertEqual(claimed[0]._state.db, "tenant_example")
+
+    def test_refresh_token_for_tenant(self):
+        """
+        Test that a tenant's refresh token is used with the X-Tenant header,
+        and is not found without it
+        """
+        self.User.objects.for_tenant("example").create_user(**self.user_details)
+        login_response = self.query(
+            '''
+            mutation UserLogin ($email: String!, $password: String!) {
+                login(email: $email, password: $password) {
+                    refreshToken
+                }
+            }
+            ''',
+            operation_name="UserLogin",
+            variables={
+                "email": self.user_details["email"],
+                "password": self.user_details["password"]
+            },
+            headers={"HTTP_X_TENANT": "example"}
+        )
+        self.assertResponseNoErrors(login_response)
+        refresh_token = json.loads(login_response.content)["data"]["login"]["refreshToken"]
+
+        refresh_query = '''
+            mutation UserRefresh ($refreshToken: String!) {
+                refreshToken(refreshToken: $refreshToken) {
+                    payload
+                }
+            }
+            '''
+
+        response = self.query(refresh_query, operation_name="UserRefresh", variables={
+            "refreshToken": refresh_token
+        })
+        self.assertResponseHasErrors(response)
+
+        response = self.query(refresh_query, operation_name="UserRefresh", variables={
+            "refreshToken": refresh_token
+        }, headers={"HTTP_X_TENANT": "example"})
+        self.assertResponseNoErrors(response)
+        self.assertEqual(json.loads(response.content)["data"]["refreshToken"]["payload"]["tenant"], "example")
+
+    def test_unknown_tenant_is_rejected(self):
+        """
+        Test that a request for an unknown tenant is rejected
+        """
+        response = self.login_user(headers={"HTTP_X_TENANT": "missing"})
+
+        self.assertEqual(response.status_code, 400)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -40,24 +41,72 @@ INSTALLED_APPS = [
     'accounts',
 
     # Third-party
-    'graphene_django'
+    'graphene_django',
+    'graphql_jwt.refresh_token.apps.RefreshTokenConfig'
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'accounts.middleware.TenantMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'accounts.middleware.SlowOperationProfilerMiddleware',
 ]
 
+# Profiles of /graphql/ requests slower than THRESHOLD_MS are kept in DIRECTORY.
+# List and render them with `python manage.py slow_operations`.
+SLOW_OPERATION_PROFILER = {
+    'THRESHOLD_MS': 500,
+    'INTERVAL_MS': 5,
+    'MAX_PROFILES': 50,
+    'DIRECTORY': BASE_DIR / 'profiles',
+}
+
 GRAPHENE = {
     'SCHEMA': 'core.schema.schema',
     'MIDDLEWARE': ['graphql_jwt.middleware.JSONWebTokenMiddleware']
 }
 
+GRAPHQL_JWT = {
+    'JWT_VERIFY_EXPIRATION': True,
+    'JWT_EXPIRATION_DELTA': timedelta(minutes=5),
+    'JWT_LONG_RUNNING_REFRESH_TOKEN': True,
+    'JWT_REFRESH_EXPIRATION_DELTA': timedelta(days=7),
+    'JWT_PAYLOAD_HANDLER': 'accounts.tenants.jwt_payload',
+}
+
+# Background jobs run by `python manage.py run_worker`.
+# Failed jobs are retried after RETRY_DELAY seconds, doubling each attempt.
+JOB_QUEUE = {
+    'BATCH_SIZE': 10,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': 10,
+    'POLL_INTERVAL': 1,
+    'LOCK_TIMEOUT': 300,
+}
+
+# Mutation results are kept for their idempotency key in the default cache,
+# which is shared between workers through the database.
+# Create its table with `python manage.py createcachetable`.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'cache',
+    }
+}
+
+# Seconds that mutation results are kept for their idempotency key.
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24
+
+# Opt in to resolving the users query from lightweight rows instead of
+# model instances
+USERS_QUERY_USE_ROWS = False
+
 AUTHENTICATION_BACKENDS = [
     'graphql_jwt.backends.JSONWebTokenBackend',
     'django.contrib.auth.backends.ModelBackend',
@@ -90,13 +139,25 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
     # 'default': {
     #     'ENGINE': 'djongo',
     #     'NAME': 'graphql_tdd_dev'
     # }
 }
 
+# Tenant keys and the database holding each tenant's data. The tenant of a
+# request comes from its JWT tenant claim or the X-Tenant header; requests
+# without one use the default database. Refresh tokens are stored in the
+# tenant database, so refreshToken and revokeToken, which carry no JWT,
+# must send X-Tenant.
+# Add a tenant's database to DATABASES before listing it here, and migrate
+# every tenant database with `python manage.py migrate_tenants`.
+
+TENANT_DATABASES = {}
+
+DATABASE_ROUTERS = ['accounts.routers.TenantRouter']
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -115,6 +176,25 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing
+# https://docs.djangoproject.com/en/3.2/topics/auth/passwords/
+# Tune with `python manage.py calibrate_hashers --target-ms <budget>`.
+# Stored hashes using other parameters are upgraded on the next login.
+
+PASSWORD_HASHERS = [
+    'accounts.hashers.PolicyPBKDF2PasswordHasher',
+    'accounts.hashers.PolicyArgon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+PASSWORD_HASHER_POLICY = {
+    'PBKDF2_ITERATIONS': 260000,
+    'ARGON2_TIME_COST': 2,
+    'ARGON2_MEMORY_COST': 102400,
+    'ARGON2_PARALLELISM': 8,
+}
+
 AUTH_USER_MODEL = 'accounts.CustomUser'
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
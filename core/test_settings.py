@@ -0,0 +1,21 @@
+"""
+Django settings for running the test suite.
+
+Adds an example tenant database so tenant routing is covered by the tests.
+`manage.py test` uses this module unless DJANGO_SETTINGS_MODULE is set.
+"""
+
+from core.settings import *  # noqa: F401,F403
+from core.settings import BASE_DIR, DATABASES
+
+DATABASES = {
+    **DATABASES,
+    'tenant_example': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'tenant_example.sqlite3',
+    },
+}
+
+TENANT_DATABASES = {
+    'example': 'tenant_example',
+}